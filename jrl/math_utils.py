@@ -195,20 +195,13 @@ def calculate_points_in_world_frame_from_local_frame_batch(
     """
     n, m, _ = points_in_local_frame.shape
 
-    # rotate then translate
+    # rotate then translate. The zero real parts and the conjugate are the same for every point, so are created once
+    zeros = torch.zeros((n, 1), device=world__T__local_frame.device)
+    world__q__local_frame_conj = quatconj(world__T__local_frame[:, 3:7])
     points_in_world_frame = []
     for i in range(m):
-        points_quat = torch.cat(
-            [
-                torch.zeros((n, 1), device=world__T__local_frame.device),
-                points_in_local_frame[:, i],
-            ],
-            dim=1,
-        )
-        pts_rotated = quatmul(
-            quatmul(world__T__local_frame[:, 3:7], points_quat),
-            quatconj(world__T__local_frame[:, 3:7]),
-        )[:, 1:]
+        points_quat = torch.cat([zeros, points_in_local_frame[:, i]], dim=1)
+        pts_rotated = quatmul(quatmul(world__T__local_frame[:, 3:7], points_quat), world__q__local_frame_conj)[:, 1:]
         pts = pts_rotated + world__T__local_frame[:, 0:3]
         points_in_world_frame.append(pts[:, None, :])
 
@@ -323,12 +316,13 @@ def geodesic_distance_between_rotation_matrices(m1: torch.Tensor, m2: torch.Tens
         torch.Tensor: [batch] tensor of angles in radians between 0 and pi
     """
     m = torch.bmm(m1, m2.transpose(1, 2))  # batch*3*3
+    # cos(theta) is given by the trace of m, sin(theta) by the norm of the axis vector of the skew symmetric part of m.
+    # Using atan2 instead of acos(cos) avoids the precision loss and unbounded gradient of acos near 0 and pi (see
+    # https://github.com/pytorch/pytorch/issues/8069#issuecomment-700397641), so no clamping epsilon is needed.
     cos = (m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2] - 1) / 2
-    # See https://github.com/pytorch/pytorch/issues/8069#issuecomment-700397641
-    # Note: Decreasing this value below 1e-7 greates NaN gradients for nearby quaternions.
-    epsilon = 1e-7
-    theta = torch.acos(torch.clamp(cos, -1 + epsilon, 1 - epsilon))
-    return theta
+    axis = 0.5 * torch.stack((m[:, 2, 1] - m[:, 1, 2], m[:, 0, 2] - m[:, 2, 0], m[:, 1, 0] - m[:, 0, 1]), dim=1)
+    sin = torch.linalg.vector_norm(axis, dim=1)
+    return torch.atan2(sin, cos)
 
 
 # ======================================================================================================================
@@ -345,43 +339,70 @@ def quaternion_xyzw_to_wxyz(quaternion: torch.Tensor) -> torch.Tensor:
     return torch.cat([quaternion[:, 3:4], quaternion[:, 0:3]], dim=1)
 
 
-def quaternion_to_rotation_matrix(quaternion: torch.Tensor):
-    """_summary_
+def _safe_quat_normalize(q: torch.Tensor) -> torch.Tensor:
+    """Normalize a batch of quaternions. Each quaternion is first divided by its largest absolute component so that
+    computing the norm can't overflow or underflow, then by its norm.
 
     Args:
-        quaternion (torch.Tensor): [batch x 4] tensor of quaternions
+        q (torch.Tensor): [batch x 4] tensor of quaternions
 
     Returns:
-        _type_: _description_
+        torch.Tensor: [batch x 4] tensor of unit quaternions
     """
-    batch = quaternion.shape[0]
-
-    # TODO: Should we normalize the quaternion here? Maybe just verify its almost normalized instead?
-    quat = normalize_vector(quaternion).contiguous()
-
-    qw = quat[..., 0].contiguous().view(batch, 1)
-    qx = quat[..., 1].contiguous().view(batch, 1)
-    qy = quat[..., 2].contiguous().view(batch, 1)
-    qz = quat[..., 3].contiguous().view(batch, 1)
+    max_abs = torch.amax(torch.abs(q), dim=1, keepdim=True).clamp(min=1e-30)
+    q_scaled = q / max_abs
+    return q_scaled / torch.linalg.vector_norm(q_scaled, dim=1, keepdim=True).clamp(min=1e-8)
 
-    # Unit quaternion rotation matrices computatation
-    xx = qx * qx
-    yy = qy * qy
-    zz = qz * qz
-    xy = qx * qy
-    xz = qx * qz
-    yz = qy * qz
-    xw = qx * qw
-    yw = qy * qw
-    zw = qz * qw
 
-    row0 = torch.cat((1 - 2 * yy - 2 * zz, 2 * xy - 2 * zw, 2 * xz + 2 * yw), 1)  # batch*3
-    row1 = torch.cat((2 * xy + 2 * zw, 1 - 2 * xx - 2 * zz, 2 * yz - 2 * xw), 1)  # batch*3
-    row2 = torch.cat((2 * xz - 2 * yw, 2 * yz + 2 * xw, 1 - 2 * xx - 2 * yy), 1)  # batch*3
+# Note: scripted so that torchscript compiles the elementwise ops below into a single function for each dtype/device.
+# Everything here therefore needs to be torchscript compatible, which is why _safe_quat_normalize() is used instead of
+# normalize_vector()
+@torch.jit.script
+def quaternion_to_rotation_matrix(quaternion: torch.Tensor) -> torch.Tensor:
+    """Convert a batch of quaternions to rotation matrices
 
-    matrix = torch.cat((row0.view(batch, 1, 3), row1.view(batch, 1, 3), row2.view(batch, 1, 3)), 1)  # batch*3*3
+    Args:
+        quaternion (torch.Tensor): [batch x 4] tensor of quaternions
 
-    return matrix
+    Returns:
+        torch.Tensor: [batch x 3 x 3] tensor of rotation matrices
+    """
+    # Any deviation from unit norm is amplified by the quadratic terms below, so normalize carefully first
+    quat = _safe_quat_normalize(quaternion)
+    qw = quat[:, 0]
+    qx = quat[:, 1]
+    qy = quat[:, 2]
+    qz = quat[:, 3]
+
+    # Each doubled product is computed once and shared between the two matrix entries it appears in
+    tx = 2 * qx
+    ty = 2 * qy
+    tz = 2 * qz
+    twx = tx * qw
+    twy = ty * qw
+    twz = tz * qw
+    txx = tx * qx
+    txy = tx * qy
+    txz = tx * qz
+    tyy = ty * qy
+    tyz = ty * qz
+    tzz = tz * qz
+
+    matrix = torch.stack(
+        [
+            1 - tyy - tzz,
+            txy - twz,
+            txz + twy,
+            txy + twz,
+            1 - txx - tzz,
+            tyz - twx,
+            txz - twy,
+            tyz + twx,
+            1 - txx - tyy,
+        ],
+        dim=-1,
+    )
+    return matrix.reshape(-1, 3, 3)
 
 
 # TODO: implement, test, compare runtime for quaternion_difference_to_rpy()
@@ -419,16 +440,17 @@ def quaternion_to_rpy(q: torch.Tensor) -> torch.Tensor:
 
 
 def quaternion_conjugate(qs: torch.Tensor) -> torch.Tensor:
-    """TODO: document"""
+    """Return the conjugate of each row of quaternions, i.e. [w, -x, -y, -z]
+
+    Args:
+        qs (torch.Tensor): [batch x 4] tensor of quaternions
+
+    Returns:
+        torch.Tensor: [batch x 4] tensor of quaternions
+    """
     assert len(qs.shape) == 2
     assert qs.shape[1] == 4
-
-    q_conj = torch.zeros(qs.shape, device=qs.device, dtype=DEFAULT_TORCH_DTYPE)
-    q_conj[:, 0] = qs[:, 0]
-    q_conj[:, 1] = -qs[:, 1]
-    q_conj[:, 2] = -qs[:, 2]
-    q_conj[:, 3] = -qs[:, 3]
-    return q_conj
+    return torch.cat((qs[:, 0:1], -qs[:, 1:4]), dim=1)
 
 
 def quatconj(q: torch.Tensor) -> torch.Tensor:
@@ -437,26 +459,35 @@ def quatconj(q: torch.Tensor) -> torch.Tensor:
 
     Author: dmillard
     """
-    w, x, y, z = tuple(q[:, i] for i in range(4))
-    return torch.vstack((w, -x, -y, -z)).T
+    return quaternion_conjugate(q)
 
 
 def quaternion_norm(qs: torch.Tensor) -> torch.Tensor:
     """TODO: document"""
     assert len(qs.shape) == 2
     assert qs.shape[1] == 4
-    return torch.norm(qs, dim=1)
+    # torch.linalg.vector_norm dispatches straight to the kernel, torch.norm goes through a python-level wrapper first
+    return torch.linalg.vector_norm(qs, dim=1)
 
 
-def quaternion_inverse(qs: torch.Tensor) -> torch.Tensor:
+def quaternion_inverse(qs: torch.Tensor, assume_unit: bool = False) -> torch.Tensor:
     """Per "CS184: Using Quaternions to Represent Rotation": The inverse of a unit quaternion is its conjugate, q-1=q'
     (https://personal.utdallas.edu/~sxb027100/dock/quaternion.html#)
 
     Check that the quaternion is a unit quaternion, then return its conjugate
+
+    Args:
+        qs (torch.Tensor): [batch x 4] tensor of unit quaternions
+        assume_unit (bool, optional): Skip the unit norm check. Set this when the quaternions are known to be
+                                        normalized, for example when they are returned by forward_kinematics().
+                                        Defaults to False.
     """
     assert len(qs.shape) == 2
     assert qs.shape[1] == 4
 
+    if assume_unit:
+        return quaternion_conjugate(qs)
+
     # Check that the quaternions are valid
     norms = quaternion_norm(qs)
     if max(norms) > 1.01 or min(norms) < 0.99:
@@ -465,26 +496,37 @@ def quaternion_inverse(qs: torch.Tensor) -> torch.Tensor:
     return quaternion_conjugate(qs)
 
 
-def quaternion_product(qs_1: torch.Tensor, qs_2: torch.Tensor) -> torch.Tensor:
-    """TODO: document"""
-    assert (len(qs_1.shape) == 2) and (len(qs_2.shape) == 2)
-    assert (qs_1.shape[1] == 4) and (qs_2.shape[1] == 4)
+def quaternion_product(qs_1: torch.Tensor, qs_2: torch.Tensor, out: Optional[torch.Tensor] = None) -> torch.Tensor:
+    """Compute the Hamilton product qs_1 * qs_2 for each row of quaternions
 
-    w1 = qs_1[:, 0]
-    x1 = qs_1[:, 1]
-    y1 = qs_1[:, 2]
-    z1 = qs_1[:, 3]
-    w2 = qs_2[:, 0]
-    x2 = qs_2[:, 1]
-    y2 = qs_2[:, 2]
-    z2 = qs_2[:, 3]
+    Args:
+        qs_1 (torch.Tensor): [batch x 4] tensor of quaternions
+        qs_2 (torch.Tensor): [batch x 4] tensor of quaternions
+        out (Optional[torch.Tensor], optional): [batch x 4] tensor to write the result to, like the `out` argument of
+                                                torch functions. Allows callers that compute many products in a loop to
+                                                reuse one buffer. Not supported by autograd. Defaults to None.
 
-    q = torch.zeros(qs_1.shape, device=qs_1.device, dtype=DEFAULT_TORCH_DTYPE)
-    q[:, 0] = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
-    q[:, 1] = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
-    q[:, 2] = w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2
-    q[:, 3] = w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2
-    return q
+    Returns:
+        torch.Tensor: [batch x 4] tensor of quaternions. This is `out` if it was provided
+    """
+    assert (len(qs_1.shape) == 2) and (len(qs_2.shape) == 2)
+    assert (qs_1.shape[1] == 4) and (qs_2.shape[1] == 4)
+    if out is not None:
+        assert out.shape == qs_1.shape, f"out.shape is {out.shape}, should be {qs_1.shape}"
+
+    # Split into component arrays so that each term of the product is a single vectorized op over the whole batch
+    w1, x1, y1, z1 = qs_1.unbind(dim=1)
+    w2, x2, y2, z2 = qs_2.unbind(dim=1)
+    return torch.stack(
+        (
+            w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+            w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+            w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+            w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
+        ),
+        dim=1,
+        out=out,
+    )
 
 
 def quatmul(q1: torch.Tensor, q2: torch.Tensor) -> torch.Tensor:
@@ -494,15 +536,7 @@ def quatmul(q1: torch.Tensor, q2: torch.Tensor) -> torch.Tensor:
     assert q1.shape[1] == 4, f"q1.shape[1] is {q1.shape[1]}, should be 4"
     assert q1.shape == q2.shape
 
-    w1, x1, y1, z1 = tuple(q1[:, i] for i in range(4))
-    w2, x2, y2, z2 = tuple(q2[:, i] for i in range(4))
-
-    return torch.vstack((
-        w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
-        w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
-        w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
-        w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
-    )).T
+    return quaternion_product(q1, q2)
 
 
 @wp.kernel
@@ -537,17 +571,32 @@ def geodesic_distance_between_quaternions(
     q1: torch.Tensor, q2: torch.Tensor, acos_epsilon: Optional[float] = None
 ) -> torch.Tensor:
     """
-    Given rows of quaternions q1 and q2, compute the geodesic distance between each
+    Given rows of quaternions q1 and q2, compute the geodesic distance between each. This is the same angle returned by
+    geodesic_distance_between_rotation_matrices() for the corresponding rotation matrices, but is computed directly
+    from the quaternions without building either matrix.
+
+    Args:
+        q1 (torch.Tensor): [batch x 4] tensor of quaternions
+        q2 (torch.Tensor): [batch x 4] tensor of quaternions
+        acos_epsilon (Optional[float], optional): Unused - no clamping is needed since acos() is no longer called. Kept
+                                                    for backwards compatibility. Defaults to None.
+
+    Returns:
+        torch.Tensor: [batch] tensor of angles in radians between 0 and pi
     """
-    # Note: Decreasing this value to 1e-8 greates NaN gradients for nearby quaternions.
-    acos_clamp_epsilon = 1e-7
-    if acos_epsilon is not None:
-        acos_clamp_epsilon = acos_epsilon
-
-    dot = torch.clip(torch.sum(q1 * q2, dim=1), -1, 1)
-    distance = 2 * torch.acos(torch.clamp(dot, -1 + acos_clamp_epsilon, 1 - acos_clamp_epsilon))
-    distance = torch.abs(torch.remainder(distance + torch.pi, 2 * torch.pi) - torch.pi)  # TODO: do we need this?
-    return distance
+    del acos_epsilon
+
+    # The relative rotation conj(q1) * q2 has scalar part cos(theta/2) = <q1, q2> and a vector part with norm
+    # sin(theta/2). atan2 of the two is accurate over the whole range and, unlike acos(<q1, q2>), has a bounded gradient
+    # for nearby quaternions. abs() handles the q ~ -q ambiguity so the angle is always in [0, pi]. The products below
+    # are formed before any scale cancels out, so normalize first to keep them from under- or overflowing.
+    q1 = _safe_quat_normalize(q1)
+    q2 = _safe_quat_normalize(q2)
+    w1, v1 = q1[:, 0:1], q1[:, 1:4]
+    w2, v2 = q2[:, 0:1], q2[:, 1:4]
+    cos_half = torch.sum(q1 * q2, dim=1)
+    sin_half = torch.linalg.vector_norm(w1 * v2 - w2 * v1 - torch.linalg.cross(v1, v2, dim=1), dim=1)
+    return 2 * torch.atan2(sin_half, torch.abs(cos_half))
 
 
 # ======================================================================================================================
@@ -1,5 +1,5 @@
 from typing import List, Tuple, Optional, Union, Dict
-from functools import cached_property
+from functools import cached_property, lru_cache
 
 from more_itertools import locate
 import torch
@@ -947,7 +947,7 @@ class Robot:
 
         # TODO: implement, test, compare runtime for quaternion_difference_to_rpy()
         # rotation_error_rpy = quaternion_difference_to_rpy(target_poses[:, 3:], current_poses[:, 3:])
-        current_pose_quat_inv = quaternion_inverse(current_poses[:, 3:7])
+        current_pose_quat_inv = quaternion_inverse(current_poses[:, 3:7], assume_unit=True)
         rotation_error_quat = quaternion_product(target_poses[:, 3:], current_pose_quat_inv)
         rotation_error_rpy = quaternion_to_rpy(rotation_error_quat)
         pose_errors[:, 0:3, 0] = rotation_error_rpy  #
@@ -1030,7 +1030,7 @@ class Robot:
         for i in range(3):
             pose_errors[:, i + 3, 0] = target_poses[:, i] - current_poses[:, i]
 
-        current_pose_quat_inv = quaternion_inverse(current_poses[:, 3:7])
+        current_pose_quat_inv = quaternion_inverse(current_poses[:, 3:7], assume_unit=True)
         rotation_error_quat = quaternion_product(target_poses[:, 3:], current_pose_quat_inv)
         rotation_error_rpy = quaternion_to_rpy(rotation_error_quat)
         pose_errors[:, 0:3, 0] = rotation_error_rpy  #
@@ -1290,6 +1290,15 @@ class Robot:
             return J
 
 
+@lru_cache(maxsize=None)
+def _get_kinpy_chain(urdf_filepath: str):
+    """Parse the urdf into a kinpy chain. Parsing is slow, so the chain is cached per urdf"""
+    import kinpy as kp
+
+    with open(urdf_filepath) as f:
+        return kp.build_chain_from_urdf(f.read().encode("utf-8"))
+
+
 def forward_kinematics_kinpy(robot: Robot, x: np.array) -> np.array:
     """
     Returns the pose of the end effector for each joint parameter setting in x
@@ -1298,8 +1307,7 @@ def forward_kinematics_kinpy(robot: Robot, x: np.array) -> np.array:
 
     import kinpy as kp
 
-    with open(robot.urdf_filepath) as f:
-        kinpy_fk_chain = kp.build_chain_from_urdf(f.read().encode("utf-8"))
+    kinpy_fk_chain = _get_kinpy_chain(robot.urdf_filepath)
 
     n = x.shape[0]
     y = np.zeros((n, 7))
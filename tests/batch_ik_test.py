@@ -5,14 +5,12 @@ import numpy as np
 import torch
 
 from jrl.robot import Robot
-from jrl.robots import get_all_robots
-from jrl.utils import set_seed, to_torch
+from jrl.utils import to_torch
 from jrl.math_utils import geodesic_distance_between_quaternions
 from jrl.config import DEVICE, PT_NP_TYPE
+from testing_utils import get_all_robots_cached
 
 
-# Set seed to ensure reproducibility
-set_seed()
 np.set_printoptions(edgeitems=30, linewidth=100000, suppress=True)
 
 
@@ -51,7 +49,7 @@ def _joint_angles_all_in_joint_limits(robot: Robot, x: PT_NP_TYPE, eps: float =
 class TestBatchIK(unittest.TestCase):
     @classmethod
     def setUpClass(clc):
-        clc.robots = get_all_robots()
+        clc.robots = get_all_robots_cached()
 
     def get_current_joint_angle_and_target_pose(self, robot: Robot, center: str) -> Tuple[np.ndarray, np.ndarray]:
         """ """
@@ -0,0 +1,11 @@
+import pytest
+
+from jrl.utils import set_seed
+
+
+@pytest.fixture(autouse=True)
+def _seed():
+    """Reseed torch, numpy and random before every test. Each test then draws the same random numbers no matter which
+    tests ran before it, or which worker it runs on when tests are run in parallel (e.g. with pytest-xdist's `-n auto`)
+    """
+    set_seed()
@@ -1,62 +1,69 @@
-from typing import Tuple
+from typing import Tuple, Optional
+from functools import lru_cache
 import unittest
 
 import torch
 import numpy as np
 
 from jrl import config
-from jrl.robots import get_all_robots, Fetch, FetchArm
+from jrl.robots import Fetch, FetchArm
 from jrl.robot import Robot, forward_kinematics_kinpy
 from jrl.math_utils import geodesic_distance_between_quaternions, rotation_matrix_to_quaternion
-from jrl.utils import set_seed, to_torch
-from testing_utils import assert_pose_positions_almost_equal, assert_pose_rotations_almost_equal
-
-set_seed()
+from jrl.utils import to_torch
+from testing_utils import assert_pose_positions_almost_equal, assert_pose_rotations_almost_equal, get_all_robots_cached
 
 np.set_printoptions(suppress=True, linewidth=200)
 torch.set_printoptions(linewidth=200, precision=5, sci_mode=False)
 DEVICE = config.DEVICE
 
 
-def decimal_range(start, stop, inc):
-    while start < stop:
-        yield start
-        start += inc
+# Joint angle offsets used by test_each_dimension_actuated()
+_OFFSETS = np.arange(-np.pi, np.pi, 1.5, dtype=np.float64)
 
 
+@lru_cache(maxsize=None)
 def get_gt_samples_and_endpoints(robot_name: str) -> Tuple[np.ndarray, np.ndarray]:
-    """Get ground truth samples and endpoints from a file."""
+    """Get ground truth samples and endpoints from a file. The arrays are cached, so they are returned read-only."""
+    samples = np.load(f"tests/ground_truth_fk_data/{robot_name}__joint_angles.npy")
+    endpoints = np.load(f"tests/ground_truth_fk_data/{robot_name}__poses.npy")
+    samples.flags.writeable = False
+    endpoints.flags.writeable = False
+    return samples, endpoints
+
 
-    return np.load(f"tests/ground_truth_fk_data/{robot_name}__joint_angles.npy"), np.load(
-        f"tests/ground_truth_fk_data/{robot_name}__poses.npy"
-    )
+def _to_device(samples: np.ndarray) -> torch.Tensor:
+    """Copy a numpy array of joint angles to DEVICE. On cuda the copy is asynchronous from pinned memory, so it overlaps
+    with whatever cpu work is run before the returned tensor is first used.
+    """
+    t = torch.from_numpy(np.ascontiguousarray(samples, dtype=np.float32))
+    if DEVICE.startswith("cuda"):
+        return t.pin_memory().to(DEVICE, non_blocking=True)
+    return t.to(DEVICE)
 
 
 class TestForwardKinematics(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        cls.robots = get_all_robots()
+        cls.robots = get_all_robots_cached()
 
     # ==================================================================================================================
     # Helper functions
     #
-    def get_fk_poses(self, robot: Robot, samples: np.array) -> Tuple[np.array, np.array, Tuple[np.array, np.array]]:
-        """Return fk solutions calculated by kinpy, klampt, and batch_fk"""
-        kinpy_fk = forward_kinematics_kinpy(robot, samples)
-        klampt_fk = robot.forward_kinematics_klampt(samples)
+    def get_fk_poses(
+        self, robot: Robot, samples: np.array
+    ) -> Tuple[torch.Tensor, torch.Tensor, Optional[torch.Tensor]]:
+        """Return fk solutions calculated by kinpy, klampt, and batch_fk. All three are returned as tensors on DEVICE so
+        that they can be compared without copying batch_fk back to the cpu. batch_fk is None if it's disabled for the
+        robot
+        """
+        # Start the host to device copy first so that it runs while kinpy and klampt are computing fk on the cpu
+        samples_pt = _to_device(samples) if robot._batch_fk_enabled else None
+        kinpy_fk = to_torch(forward_kinematics_kinpy(robot, samples))
+        klampt_fk = to_torch(robot.forward_kinematics_klampt(samples))
 
+        batch_fk = None
         if robot._batch_fk_enabled:
-            batch_fk = (
-                robot.forward_kinematics(
-                    torch.tensor(samples, dtype=torch.float32, device=DEVICE),
-                    out_device=DEVICE,
-                    return_quaternion=True,
-                )
-                .cpu()
-                .numpy()
-            )
-        else:
-            batch_fk = (None, None)
+            batch_fk = robot.forward_kinematics(samples_pt, out_device=DEVICE, return_quaternion=True)
         return kinpy_fk, klampt_fk, batch_fk
 
     # ==================================================================================================================
@@ -96,6 +103,7 @@ class TestForwardKinematics(unittest.TestCase):
             # Should be able to propagate the gradient of the error (out.mean()) through forward_kinematics()
             out.mean().backward()
 
+    @torch.no_grad()
     def test_forward_kinematics_batch(self):
         """Test that forward_kinematics is well formatted when returning both quaternions and transformation
         matrices"""
@@ -105,16 +113,15 @@ class TestForwardKinematics(unittest.TestCase):
 
             # Check 1: Return is correct for homogeneous transformation format
             samples = robot.sample_joint_angles(25)
+            samples_pt = _to_device(samples)
             kinpy_fk = forward_kinematics_kinpy(robot, samples)
-            batch_fk_T = robot.forward_kinematics(
-                torch.tensor(samples, dtype=torch.float32, device=DEVICE), out_device=DEVICE, return_quaternion=False
-            )
+            batch_fk_T = robot.forward_kinematics(samples_pt, out_device=DEVICE, return_quaternion=False)
             self.assertEqual(batch_fk_T.shape, (25, 4, 4))
-            batch_fk_t = batch_fk_T[:, 0:3, 3].detach().cpu().numpy()
-            np.testing.assert_allclose(kinpy_fk[:, 0:3], batch_fk_t, atol=1e-4)
+            torch.testing.assert_close(batch_fk_T[:, 0:3, 3], to_torch(kinpy_fk[:, 0:3]), atol=1e-4, rtol=0)
 
             # Check 2: Return is correct for quaternion format
             samples = robot.sample_joint_angles(25)
+            samples_pt = _to_device(samples)
             kinpy_fk = forward_kinematics_kinpy(robot, samples)
             klampt_fk = robot.forward_kinematics_klampt(samples)
             # First - sanity check kinpy and klampt
@@ -122,17 +129,12 @@ class TestForwardKinematics(unittest.TestCase):
             assert_pose_rotations_almost_equal(kinpy_fk, klampt_fk)
 
             # Second - check batch_fk
-            batch_fk = (
-                robot.forward_kinematics(
-                    torch.tensor(samples, dtype=torch.float32, device=DEVICE), out_device=DEVICE, return_quaternion=True
-                )
-                .cpu()
-                .numpy()
-            )
+            batch_fk = robot.forward_kinematics(samples_pt, out_device=DEVICE, return_quaternion=True)
             self.assertEqual(batch_fk.shape, (25, 7))
-            np.testing.assert_allclose(kinpy_fk[:, 0:3], batch_fk[:, 0:3], atol=1e-4)
+            torch.testing.assert_close(batch_fk[:, 0:3], to_torch(kinpy_fk[:, 0:3]), atol=1e-4, rtol=0)
             assert_pose_rotations_almost_equal(kinpy_fk, batch_fk)
 
+    @torch.no_grad()
     def test_fk_matches_saved_data(self):
         """
         Test that the all three forward kinematics functions return the expected value for saved input
@@ -140,6 +142,7 @@ class TestForwardKinematics(unittest.TestCase):
         for robot in self.robots:
             samples, endpoints_expected = get_gt_samples_and_endpoints(robot.name)
             kinpy_fk, klampt_fk, batch_fk = self.get_fk_poses(robot, samples)
+            endpoints_expected = to_torch(endpoints_expected)
 
             if robot._batch_fk_enabled:
                 assert_pose_positions_almost_equal(kinpy_fk, batch_fk, "kinpy_fk", "batch_fk_t")
@@ -158,6 +161,7 @@ class TestForwardKinematics(unittest.TestCase):
             assert_pose_rotations_almost_equal(kinpy_fk, endpoints_expected)
             assert_pose_rotations_almost_equal(klampt_fk, endpoints_expected)
 
+    @torch.no_grad()
     def test_fk_functions_equal(self):
         """
         Test that kinpy, klampt, and batch_fk all return the same poses
@@ -182,29 +186,36 @@ class TestForwardKinematics(unittest.TestCase):
         rad_min_diff = 0.001
 
         n_samples = 5
+        offsets = _OFFSETS
+        n_offsets = offsets.shape[0]
         for robot in self.robots:
             samples = robot.sample_joint_angles(n_samples)
             samples_fks = forward_kinematics_kinpy(robot, samples)
 
-            # Iterate through each sample
-            for sample_i in range(n_samples):
-                # For each sample, iterate through the number of joints
-                for joint_i in range(robot.ndof):
-                    for offset in decimal_range(-np.pi, np.pi, 1.5):
-                        pertubation = np.zeros(robot.ndof)
-                        pertubation[joint_i] = offset
-                        sample = np.array([samples[sample_i, :] + pertubation])
-                        fk_i = forward_kinematics_kinpy(robot, sample)
-
-                        positional_diff = np.linalg.norm(fk_i[0, 0:3] - samples_fks[sample_i, 0:3])
-                        angular_diff = geodesic_distance_between_quaternions(
-                            to_torch(fk_i[0, 3:].reshape((1, 4))), to_torch(samples_fks[sample_i, 3:].reshape((1, 4)))
-                        )[0]
-
-                        self.assertTrue(
-                            positional_diff > pos_min_diff or angular_diff > rad_min_diff,
-                            msg="positional_diff={}, angular_diff={}".format(positional_diff, angular_diff),
-                        )
+            # Perturb each joint of each sample by each offset, and run fk on every perturbed sample in a single batch.
+            # Rows are ordered by (sample_i, joint_i, offset_i)
+            perturbations = (np.eye(robot.ndof)[:, None, :] * offsets[None, :, None]).reshape(-1, robot.ndof)
+            n_perturbations = robot.ndof * n_offsets
+            perturbed_samples = np.repeat(samples, n_perturbations, axis=0) + np.tile(perturbations, (n_samples, 1))
+            perturbed_fks = forward_kinematics_kinpy(robot, perturbed_samples)
+            unperturbed_fks = np.repeat(samples_fks, n_perturbations, axis=0)
+
+            positional_diffs = np.linalg.norm(perturbed_fks[:, 0:3] - unperturbed_fks[:, 0:3], axis=1)
+            angular_diffs = (
+                geodesic_distance_between_quaternions(to_torch(perturbed_fks[:, 3:]), to_torch(unperturbed_fks[:, 3:]))
+                .cpu()
+                .numpy()
+            )
+
+            not_actuated = np.logical_not((positional_diffs > pos_min_diff) | (angular_diffs > rad_min_diff))
+            if not_actuated.any():
+                i = int(np.argmax(not_actuated))
+                sample_i, joint_i, offset_i = np.unravel_index(i, (n_samples, robot.ndof, n_offsets))
+                self.fail(
+                    f"{int(not_actuated.sum())}/{not_actuated.size} perturbations are not actuated for"
+                    f" '{robot.name}', first is joint {joint_i} of sample {sample_i} with offset {offsets[offset_i]}"
+                    f" (positional_diff={positional_diffs[i]}, angular_diff={angular_diffs[i]})"
+                )
 
 
 if __name__ == "__main__":
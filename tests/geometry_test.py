@@ -3,15 +3,12 @@ import unittest
 import torch
 import numpy as np
 
-from jrl.utils import set_seed
 from jrl.geometry import capsule_capsule_distance_batch, capsule_cuboid_distance_batch
 from jrl.math_utils import quaternion_to_rotation_matrix
 from jrl.config import DEVICE
 
 import fcl
 
-# Set seed to ensure reproducibility
-set_seed()
 torch.set_default_dtype(torch.float32)
 torch.set_default_device(DEVICE)
 
@@ -4,12 +4,9 @@ from time import time
 import numpy as np
 
 from jrl.robot import Robot
-from jrl.robots import get_all_robots, Panda
-from jrl.utils import set_seed, to_torch
-from testing_utils import assert_pose_positions_almost_equal, assert_pose_rotations_almost_equal
-
-# Set seed to ensure reproducibility
-set_seed()
+from jrl.robots import Panda
+from jrl.utils import to_torch
+from testing_utils import assert_pose_positions_almost_equal, assert_pose_rotations_almost_equal, get_all_robots_cached
 
 np.set_printoptions(edgeitems=30, linewidth=100000)
 
@@ -17,7 +14,7 @@ np.set_printoptions(edgeitems=30, linewidth=100000)
 class TestInverseKinematics(unittest.TestCase):
     @classmethod
     def setUpClass(self):
-        self.robots = get_all_robots()
+        self.robots = get_all_robots_cached()
         self.panda = Panda()
 
     def assert_solution_is_valid(self, robot: Robot, solution: np.ndarray, pose_gt: np.ndarray, positional_tol: float):
@@ -7,6 +7,7 @@ from jrl.math_utils import (
     quaternion_to_rotation_matrix,
     geodesic_distance_between_rotation_matrices,
     quaternion_conjugate,
+    quaternion_inverse,
     quaternion_norm,
     geodesic_distance_between_quaternions,
     geodesic_distance_between_quaternions_warp,
@@ -16,12 +17,9 @@ from jrl.math_utils import (
     angular_subtraction,
     calculate_points_in_world_frame_from_local_frame_batch,
 )
-from jrl.utils import set_seed, to_torch
+from jrl.utils import to_torch, random_quaternions
 from jrl.robots import FetchArm
 
-# Set seed to ensure reproducibility
-set_seed()
-
 # suppress=True: print with decimal notation, not scientific
 np.set_printoptions(edgeitems=30, linewidth=100000, suppress=True, precision=12)
 torch.set_printoptions(linewidth=5000, sci_mode=False)
@@ -150,28 +148,37 @@ class TestConversions(unittest.TestCase):
 
     def test_geodesic_distance_between_quaternions(self):
         """Test geodesic_distance_between_quaternions with torch tensor inputs"""
-        q1 = torch.tensor([[1.0, 0.0, 0.0, 0.0]], device="cpu", dtype=torch.float32)
-        # Rotation about +x axis by .25 radians
-        q2 = torch.tensor([[0.9921977, 0.1246747, 0, 0]], device="cpu", dtype=torch.float32)
-        returned = geodesic_distance_between_quaternions(q1, q2)[0].item()
-        self.assertAlmostEqual(0.25, returned, places=6)
-
-        # Test 2
-        q1 = torch.tensor([[1.0, 0.0, 0.0, 0.0]], device="cpu", dtype=torch.float32)
-        q2 = torch.tensor([[0.0, 0.92387953, 0.38268343, 0.0]], device="cpu", dtype=torch.float32)
-        returned = geodesic_distance_between_quaternions(q1, q2)[0].item()
-        # TODO: AssertionError: 3.1415927 != 3.1411044597625732 within 7 places (0.00048824023742666256 difference). It
-        # seems like rotation matrices created by quaternions have lower precision
-        self.assertAlmostEqual(3.1415927, returned, places=3)
-
-        # Test 3
         q1 = torch.tensor([[1.0, 0.0, 0.0, 0.0], [1.0, 0.0, 0.0, 0.0]], device="cpu", dtype=torch.float32)
         q2 = torch.tensor(
-            [[0.0, 0.92387953, 0.38268343, 0.0], [0.9921977, 0.1246747, 0, 0]], device="cpu", dtype=torch.float32
+            [
+                [0.9921977, 0.1246747, 0, 0],  # Rotation about +x axis by .25 radians
+                [0.0, 0.92387953, 0.38268343, 0.0],
+            ],
+            device="cpu",
+            dtype=torch.float32,
         )
         returned = geodesic_distance_between_quaternions(q1, q2)
-        self.assertAlmostEqual(3.1415927, returned[0].item(), places=3)
-        self.assertAlmostEqual(0.25, returned[1].item(), places=6)
+        expected = torch.tensor([0.25, 3.1415927], device="cpu", dtype=torch.float32)
+        torch.testing.assert_close(returned, expected, atol=1e-6, rtol=0)
+
+        # Quaternions are normalized first, including ones whose products would under- or overflow
+        for scale in [1e-20, 0.5, 3.0, 1e25]:
+            returned = geodesic_distance_between_quaternions(scale * q1, scale * q2)
+            torch.testing.assert_close(returned, expected, atol=1e-6, rtol=0)
+
+    def test_geodesic_distance_between_quaternions_matches_rotation_matrices(self):
+        """Test that geodesic_distance_between_quaternions() returns the same angle as
+        geodesic_distance_between_rotation_matrices() does for the equivalent rotation matrices
+        """
+        q1 = random_quaternions(25, device="cpu")
+        q2 = random_quaternions(25, device="cpu")
+        # Flip the sign of half of the quaternions - q and -q describe the same rotation
+        q2[::2] = -q2[::2]
+        returned = geodesic_distance_between_quaternions(q1, q2)
+        expected = geodesic_distance_between_rotation_matrices(
+            quaternion_to_rotation_matrix(q1), quaternion_to_rotation_matrix(q2)
+        )
+        torch.testing.assert_close(returned, expected, atol=1e-3, rtol=0)
 
     def test_geodesic_distance_between_quaternions_warp(self):
         """Test geodesic_distance_between_quaternions with torch tensor inputs"""
@@ -218,30 +225,27 @@ class TestConversions(unittest.TestCase):
         R_returned = quaternion_to_rotation_matrix(q)[0]
         torch.testing.assert_close(R_returned, R_expected)
 
+        # Test 3: Quaternions are normalized first, including ones whose squared norm would under- or overflow
+        for scale in [1e-25, 0.5, 3.0, 1e25]:
+            R_returned = quaternion_to_rotation_matrix(scale * q)[0]
+            torch.testing.assert_close(R_returned, R_expected)
+
     def test_rotational_distance_between_rotation_matrices(self):
         """Test geodesic_distance_between_rotation_matrices()"""
-        R1 = torch.tensor([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]], device="cpu", dtype=torch.float32)
-
-        # Rotation by 1 rad about the +z axis
+        R1 = torch.eye(3, device="cpu").expand(2, 3, 3)
         R2 = torch.tensor(
-            [[0.5403023, -0.8414710, 0.0], [0.8414710, 0.5403023, 0.0], [0.0, 0.0, 1.0]],
-            device="cpu",
-            dtype=torch.float32,
-        )
-        distance_expected = 1.0
-        returned = geodesic_distance_between_rotation_matrices(R1[None, :], R2[None, :])
-        self.assertAlmostEqual(returned[0].item(), distance_expected, delta=5e-4)
-
-        # Test 2: ___
-        R1 = torch.tensor([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]], device="cpu", dtype=torch.float32)
-        R2 = torch.tensor(
-            [[0.7071068, 0.7071068, 0.0000000], [0.7071068, -0.7071068, 0.0000000], [0.0000000, 0.0000000, -1.0000000]],
+            [
+                # Rotation by 1 rad about the +z axis
+                [[0.5403023, -0.8414710, 0.0], [0.8414710, 0.5403023, 0.0], [0.0, 0.0, 1.0]],
+                # Rotation by pi rad
+                [[0.7071068, 0.7071068, 0.0], [0.7071068, -0.7071068, 0.0], [0.0, 0.0, -1.0]],
+            ],
             device="cpu",
             dtype=torch.float32,
         )
-        returned = geodesic_distance_between_rotation_matrices(R1[None, :], R2[None, :])
-        distance_expected = 3.1415927
-        self.assertAlmostEqual(returned[0].item(), distance_expected, delta=5e-4)
+        returned = geodesic_distance_between_rotation_matrices(R1, R2)
+        expected = torch.tensor([1.0, 3.1415927], device="cpu", dtype=torch.float32)
+        torch.testing.assert_close(returned, expected, atol=1e-5, rtol=0)
 
     def test_geodesic_distance_between_rotation_matrices(self):
         """Test geodesic_distance_between_rotation_matrices()"""
@@ -254,7 +258,7 @@ class TestConversions(unittest.TestCase):
 
         # Test #1: Returns 0 for closeby quaternions
         distance = geodesic_distance_between_rotation_matrices(m1, m2)
-        self.assertAlmostEqual(distance[0].item(), 0.0, delta=5e-4)
+        torch.testing.assert_close(distance.detach(), torch.zeros(1, device="cpu"), atol=5e-4, rtol=0)
 
         # Test #2: Passes a gradient when for closeby quaternions
         loss = distance.mean()
@@ -279,6 +283,19 @@ class TestConversions(unittest.TestCase):
         self.assertEqual(q0_conjugate_returned_2.shape, (2, 4))
         torch.testing.assert_close(q0_conjugate_returned_2, q0_conjugate_expected)
 
+    def test_quaternion_inverse(self):
+        # w, x, y, z
+        qs = torch.tensor([[1, 0, 0, 0], [0.7071068, 0, 0, 0.7071068]], dtype=torch.float32)
+        qs_inverse_expected = torch.tensor([[1, 0, 0, 0], [0.7071068, 0, 0, -0.7071068]], dtype=torch.float32)
+
+        # Test 1: quaternion_inverse() is correct with and without the unit norm check
+        torch.testing.assert_close(quaternion_inverse(qs), qs_inverse_expected)
+        torch.testing.assert_close(quaternion_inverse(qs, assume_unit=True), qs_inverse_expected)
+
+        # Test 2: non unit quaternions are rejected unless assume_unit is set
+        with self.assertRaises(RuntimeError):
+            quaternion_inverse(2 * qs)
+
     def test_quaternion_norm(self):
         # w, x, y, z
         qs = torch.tensor(
@@ -327,6 +344,12 @@ class TestConversions(unittest.TestCase):
 
         product_returned_2 = quatmul(q1, q2)
         torch.testing.assert_close(product_expected, product_returned_2)
+
+        # Test 3: the product is written to 'out' when it's provided
+        out = torch.zeros((4, 4), dtype=torch.float32)
+        product_returned_3 = quaternion_product(q1, q2, out=out)
+        self.assertIs(product_returned_3, out)
+        torch.testing.assert_close(product_expected, out)
         print(f"test_quaternion_product() passed")
 
 
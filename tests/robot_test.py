@@ -6,16 +6,15 @@ import numpy as np
 from jrl.urdf_utils import _len3_tuple_from_str
 from jrl.utils import set_seed
 from jrl.robot import Robot
-from jrl.robots import get_all_robots, Panda, Fetch, Iiwa7, FetchArm
+from jrl.robots import Panda, Fetch, Iiwa7, FetchArm
 from jrl.config import DEVICE, PT_NP_TYPE
-
-set_seed(0)
+from testing_utils import get_all_robots_cached
 
 
 class RobotTest(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        cls.robots = get_all_robots()
+        cls.robots = get_all_robots_cached()
 
     def _assert_joint_angles_within_limits(self, joint_angles: PT_NP_TYPE, robot: Robot):
         for joint_angle in joint_angles:
@@ -1,6 +1,10 @@
+from typing import Tuple
+from functools import lru_cache
+
 import torch
-import numpy as np
 
+from jrl.robot import Robot
+from jrl.robots import get_all_robots
 from jrl.utils import to_torch
 from jrl.math_utils import geodesic_distance_between_quaternions
 from jrl.config import PT_NP_TYPE
@@ -9,6 +13,14 @@ _DEFAULT_MAX_ALLOWABLE_L2_ERR = 5e-4
 _DEFAULT_MAX_ALLOWABLE_ANG_ERR = 3.141592 / 180 * 0.075  # 0.075 degrees
 
 
+@lru_cache(maxsize=1)
+def get_all_robots_cached() -> Tuple[Robot, ...]:
+    """Return all robots from get_all_robots(). Creating a robot is slow (urdf parsing, klampt initialization), so the
+    robots are only created the first time this is called, and are then shared by every test module in the process.
+    """
+    return tuple(get_all_robots())
+
+
 def assert_pose_positions_almost_equal(
     endpoints1: PT_NP_TYPE,
     endpoints2: PT_NP_TYPE,
@@ -16,33 +28,32 @@ def assert_pose_positions_almost_equal(
     source_2: str = "",
     threshold: float = _DEFAULT_MAX_ALLOWABLE_L2_ERR,
 ):
-    """Check that the position of each pose is nearly the same"""
-    if isinstance(endpoints1, torch.Tensor):
-        l2_errors = torch.norm(endpoints1[:, 0:3] - endpoints2[:, 0:3], dim=1)
-    else:
-        l2_errors = np.linalg.norm(endpoints1[:, 0:3] - endpoints2[:, 0:3], axis=1)
-    for i in range(l2_errors.shape[0]):
-        assert (
-            l2_errors[i] < threshold
-        ), f"Position of poses '{source_1}', '{source_2}' are not equal (error={l2_errors[i]})"
+    """Check that the position of each pose is nearly the same. Only the largest error is copied off of the device"""
+    endpoints1 = to_torch(endpoints1)
+    endpoints2 = to_torch(endpoints2).to(endpoints1.device)
+    l2_errors = torch.norm(endpoints1[:, 0:3] - endpoints2[:, 0:3], dim=1)
+    max_error, i = torch.max(l2_errors, dim=0)
+    assert (
+        max_error < threshold
+    ), f"Position of poses '{source_1}', '{source_2}' are not equal (error={max_error} for pose {i.item()})"
 
 
 def assert_pose_rotations_almost_equal(
-    endpoints1: np.array,
-    endpoints2: np.array,
+    endpoints1: PT_NP_TYPE,
+    endpoints2: PT_NP_TYPE,
     source_1: str = "",
     source_2: str = "",
     threshold: float = _DEFAULT_MAX_ALLOWABLE_ANG_ERR,
 ):
-    """Check that the rotation of each pose is nearly the same"""
+    """Check that the rotation of each pose is nearly the same. Only the largest error is copied off of the device"""
     endpoints1 = to_torch(endpoints1)
-    endpoints2 = to_torch(endpoints2)
+    endpoints2 = to_torch(endpoints2).to(endpoints1.device)
     assert endpoints1.shape[1] == 7
     assert endpoints2.shape[1] == 7
     assert endpoints1.shape[0] == endpoints2.shape[0]
     errors = geodesic_distance_between_quaternions(endpoints1[:, 3 : 3 + 4], endpoints2[:, 3 : 3 + 4])
-    for i in range(errors.shape[0]):
-        assert errors[i] < threshold, (
-            f"Rotation of poses '{source_1}({endpoints1[i, :]})', '{source_2} ({endpoints2[i, :]})' are not equal"
-            f" (error={errors[i]})"
-        )
+    max_error, i = torch.max(errors, dim=0)
+    assert max_error < threshold, (
+        f"Rotation of poses '{source_1}({endpoints1[i, :]})', '{source_2} ({endpoints2[i, :]})' are not equal"
+        f" (error={max_error})"
+    )